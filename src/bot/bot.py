@@ -1,9 +1,13 @@
 """Bot that trades on Oanda."""
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 from time import sleep
+from typing import Any
+import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
 
 from bot.common import (
     APP_START_TIME,
@@ -13,13 +17,13 @@ from bot.common import (
     PerfTimer,
     TradeConfig,
 )
-from bot.solve import get_git_info, preprocess, solve
-from core.kernel import EdgeCategory, KernelConfig, kernel
+from bot.live import LiveState
+from bot.solve import get_git_info, solve
+from core.kernel import KernelConfig, kernel
 from bot.reporting import report
 from bot.exchange import (
     close_trade,
     get_open_trade,
-    getOandaOHLC,
     place_market_order,
     OandaContext,
 )
@@ -31,32 +35,42 @@ CLOSE_UTC = 21
 QUARTER_PAST = 15
 
 
+@dataclass(slots=True)
+class Record:
+    """The kernel output of a single candle."""
+
+    signal: int
+    trigger: int
+
+    @classmethod
+    def from_arrays(cls, data: dict[str, NDArray[Any]], index: int) -> "Record":
+        """Create a Record from the kernel output arrays at the given index."""
+        return cls(int(data["signal"][index]), int(data["trigger"][index]))
+
+
 def bot_run(
     ctx: OandaContext,
     kernel_conf: KernelConfig,
-    chart_conf: ChartConfig,
+    live_state: LiveState,
     trade_conf: TradeConfig,
     backtest_only: bool = False,
-) -> tuple[int, pd.DataFrame | None, Exception | None]:
+) -> tuple[int, dict[str, NDArray[Any]] | None, Exception | None]:
     """Run the bot."""
     # get open trades and candles
     trade_id = -1
     try:
         trade_id = get_open_trade(ctx, trade_conf.bot_id)
-        df = getOandaOHLC(
-            ctx, count=chart_conf.candle_count, granularity=chart_conf.granularity
-        )
-        df = preprocess(df, kernel_conf.wma_period)
+        data = live_state.refresh(ctx)
     except Exception as err:
         return -1, None, err
 
     # run kernel on candles
-    recent_last_time = datetime.fromisoformat(df.iloc[-1]["timestamp"])
-    df = kernel(df, config=kernel_conf)
+    recent_last_time = datetime.fromisoformat(data["timestamp"][-1])
+    data = kernel(data, config=kernel_conf)
 
     # backtest only and do not trade
     if backtest_only:
-        return trade_id, df, None
+        return trade_id, data, None
 
     # check if the current time is greater than the recent last time
     current_time = datetime.now(tz=recent_last_time.tzinfo).replace(
@@ -68,13 +82,13 @@ def bot_run(
     ):
         return (
             trade_id,
-            df,
+            data,
             Exception(f"curr:{current_time} last:{recent_last_time}"),
         )
 
     # place order
     try:
-        rec = _get_rec(kernel_conf, trade_id, df)
+        rec = _get_rec(kernel_conf, trade_id, data)
         if rec.trigger == 1 and trade_id == -1:
             trade_id = place_market_order(
                 ctx,
@@ -88,17 +102,17 @@ def bot_run(
             close_trade(ctx, trade_id)
             trade_id = -1
     except Exception as err:
-        return trade_id, df, err
+        return trade_id, data, err
 
-    return trade_id, df, None
+    return trade_id, data, None
 
 
-def _get_rec(kernel_conf, trade_id, df):
-    """Get the last row of the dataframe."""
-    return (
-        df.iloc[-1]
-        if trade_id != -1 and kernel_conf.edge == EdgeCategory.Quasi
-        else df.iloc[-2]
+def _get_rec(
+    kernel_conf: KernelConfig, trade_id: int, data: dict[str, NDArray[Any]]
+) -> Record:
+    """Get the record of the candle to trade on."""
+    return Record.from_arrays(
+        data, -1 if trade_id != -1 and kernel_conf.is_quasi else -2
     )
 
 
@@ -147,6 +161,7 @@ def bot(
         return None
 
     sample_chart_conf, sconf = _full_solve(oanda_ctx, bot_conf, logger)
+    live_state = LiveState(sample_chart_conf, sconf.wma_period)
     last_solver_time = datetime.now()
 
     if not bot_conf.backtest_only:
@@ -154,14 +169,14 @@ def bot(
 
     # run bot
     trade_id: int = -1
-    df: pd.DataFrame | None = None
+    data: dict[str, NDArray[Any]] | None = None
     err: Exception | None = None
     while True:
         with PerfTimer(APP_START_TIME, logger):
-            trade_id, df, err = bot_run(
+            trade_id, data, err = bot_run(
                 oanda_ctx,
                 sconf,
-                chart_conf=sample_chart_conf,
+                live_state=live_state,
                 trade_conf=bot_conf.trade_conf,
                 backtest_only=bot_conf.backtest_only,
             )
@@ -170,7 +185,7 @@ def bot(
             sleep(2)
             continue
 
-        log_event(bot_conf, sconf, trade_id, df, git_info)
+        log_event(bot_conf, sconf, trade_id, data, git_info)
 
         if bot_conf.backtest_only:
             break
@@ -187,6 +202,12 @@ def bot(
                 sleep(2)
                 continue
 
+            if (
+                sample_chart_conf != live_state.chart_conf
+                or sconf.wma_period != live_state.wma_period
+            ):
+                live_state = LiveState(sample_chart_conf, sconf.wma_period)
+
             last_solver_time = datetime.now()
 
         _sleep_until_next_5_minute()
@@ -232,7 +253,7 @@ def log_event(
     bot_conf: BotConfig,
     kernel_conf: KernelConfig,
     trade_id: int,
-    df: pd.DataFrame | None,
+    data: dict[str, NDArray[Any]] | None,
     git_info: tuple[str, bool],
 ) -> None:
     """Log event details and report trading results.
@@ -247,8 +268,8 @@ def log_event(
         The kernel configuration.
     trade_id : int
         The trade ID.
-    df : pd.DataFrame or None
-        The DataFrame containing the trading data, or None if not available.
+    data : dict[str, NDArray[Any]] or None
+        The arrays containing the trading data, or None if not available.
     git_info : tuple[str, bool]
         The Git information.
 
@@ -258,26 +279,38 @@ def log_event(
 
     """
     logger = logging.getLogger("bot")
-    logger.info(f"git commit: {git_info[0]}, porcelain: {git_info[1]}")
-    logger.info(f"columns used: {kernel_conf}")
-    logger.info(f"trade id: {trade_id}")
-    logger.info(f"run complete. {bot_conf.trade_conf.bot_id}")
-
-    if df is not None:
-        min_exit_value = round(df["exit_value"].min(), 5)
-        max_exit_value = round(df["exit_value"].max(), 5)
-        wins = (df["exit_value"] > 0).astype(int).cumsum()
-        losses = (df["exit_value"] < 0).astype(int).cumsum()
+    logger.info("git commit: %s, porcelain: %s", git_info[0], git_info[1])
+    logger.info("columns used: %s", kernel_conf)
+    logger.info("trade id: %s", trade_id)
+    logger.info("run complete. %s", bot_conf.trade_conf.bot_id)
+
+    if data is not None:
+        exit_value = data["exit_value"]
+        min_exit_value = round(np.nanmin(exit_value), 5)
+        max_exit_value = round(np.nanmax(exit_value), 5)
+        wins = (exit_value > 0).sum()
+        losses = (exit_value < 0).sum()
         logger.info(
-            f"w: {wins.iloc[-1]} l: {losses.iloc[-1]} min: {min_exit_value} max: {max_exit_value}"
-        )
-        report(
-            df,
-            bot_conf.chart_conf.instrument,
-            kernel_conf,
-            length=60 if bot_conf.backtest_only else 3,
+            "w: %s l: %s min: %s max: %s",
+            wins,
+            losses,
+            min_exit_value,
+            max_exit_value,
         )
 
+        # nothing changed on steady state ticks so skip the report, and only
+        # build the full window DataFrame when the report would be logged
+        rec = _get_rec(kernel_conf, trade_id, data)
+        if (
+            bot_conf.backtest_only or rec.trigger != 0 or rec.signal != 0
+        ) and logging.getLogger("reporting").isEnabledFor(logging.INFO):
+            report(
+                pd.DataFrame(data),
+                bot_conf.chart_conf.instrument,
+                kernel_conf,
+                length=60 if bot_conf.backtest_only else 3,
+            )
+
 
 def roundUp(dt: datetime) -> datetime:
     """Round a datetime object to the next 5 minute interval.
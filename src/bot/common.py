@@ -7,7 +7,7 @@ from typing import Generator
 import uuid
 
 import numpy as np
-from core.kernel import KernelConfig
+from core.kernel import EdgeCategory, KernelConfig
 
 APP_START_TIME = datetime.now()
 FRIDAY = 5
@@ -46,12 +46,23 @@ class SolverConfig:
     sample_size: int = 100
     train_size: int = 80
     dates: list[datetime] | None = None
+    num_threads: int = 0  # solver threads, 0 uses every core
 
     def get_configs(
-        self, kernel_conf: KernelConfig
+        self, kernel_conf: KernelConfig, edge_filter: EdgeCategory | None = None
     ) -> tuple[Generator[KernelConfig], int]:
-        """Get column pairs."""
+        """Get column pairs.
+
+        When edge_filter is set only configs with a matching edge are generated.
+        """
         if kernel_conf.signal_buy_column == "":
+            # the edge only depends on the exit column so filter those up front
+            exit_columns = [
+                se
+                for se in self.source_columns
+                if edge_filter is None
+                or KernelConfig(signal_exit_column=se).edge == edge_filter
+            ]
             gen = (
                 KernelConfig(
                     signal_buy_column=sb,
@@ -63,14 +74,19 @@ class SolverConfig:
                 )
                 for so in self.source_columns
                 for sb in self.source_columns
-                for se in self.source_columns
+                for se in exit_columns
                 for tp in self.take_profit
                 for sl in self.stop_loss
             )
-            return gen, len(self.source_columns) ** 3 * len(self.take_profit) * len(
-                self.stop_loss
-            )
+            return gen, len(self.source_columns) ** 2 * len(exit_columns) * len(
+                self.take_profit
+            ) * len(self.stop_loss)
         else:
+            take_profits = (
+                self.take_profit
+                if edge_filter is None or kernel_conf.edge == edge_filter
+                else []
+            )
             gen = (
                 KernelConfig(
                     signal_buy_column=kernel_conf.signal_buy_column,
@@ -80,10 +96,10 @@ class SolverConfig:
                     take_profit=tp,
                     stop_loss=sl,
                 )
-                for tp in self.take_profit
+                for tp in take_profits
                 for sl in self.stop_loss
             )
-            return gen, len(self.take_profit) * len(self.stop_loss)
+            return gen, len(take_profits) * len(self.stop_loss)
 
 
 @dataclass
@@ -144,6 +160,6 @@ class PerfTimer:
     def __exit__(self, exc_type, exc_value, traceback) -> None:  # type:ignore
         """Stop the timer."""
         self.end = datetime.now()
-        self.logger.info(f"run interval: {self.end - self.start}")
+        self.logger.info("run interval: %s", self.end - self.start)
         self.logger.info("up time: %s", (self.end - self.app_start_time))
         self.logger.info("last run time: %s", self.end.strftime("%Y-%m-%d %H:%M:%S"))
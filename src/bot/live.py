@@ -0,0 +1,139 @@
+"""Rolling window of preprocessed candles for the live bot."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from bot.common import ChartConfig
+from bot.exchange import OandaContext, getOandaOHLC
+from core.chart import frame_to_arrays, preprocess_arrays
+from core.kernel import PRICE_COLUMNS
+
+
+@dataclass
+class LiveState:
+    """Preprocessed candles kept between bot ticks.
+
+    The first tick fetches the full window of candles. Later ticks only fetch the
+    candles from the second to last bar onwards, so the response always overlaps
+    the stored window whether or not Oanda includes the from time. The overlapping
+    bars are replaced, the oldest bars are evicted and the indicators of the new
+    bars are updated from the bars before them. The arrays are kept in float64
+    so the recurrences do not accumulate rounding between ticks.
+    """
+
+    chart_conf: ChartConfig
+    wma_period: int
+    data: dict[str, NDArray[Any]] = field(default_factory=dict)
+
+    def refresh(self, ctx: OandaContext) -> dict[str, NDArray[Any]]:
+        """Fetch the newest candles and update the window.
+
+        Parameters
+        ----------
+        ctx : OandaContext
+            The Oanda API context.
+
+        Returns
+        -------
+        dict[str, NDArray[Any]]
+            A shallow copy of the window of preprocessed arrays.
+
+        """
+        timestamps = self.data.get("timestamp")
+        if timestamps is not None and timestamps.shape[0] > 1:
+            candles = frame_to_arrays(
+                getOandaOHLC(
+                    ctx,
+                    count=self.chart_conf.candle_count,
+                    granularity=self.chart_conf.granularity,
+                    fromTime=datetime.fromisoformat(timestamps[-2]),
+                )
+            )
+            if candles["timestamp"].shape[0] == 0:
+                return dict(self.data)
+
+            # only update in place when the candles overlap the stored window
+            start = int(np.searchsorted(timestamps, candles["timestamp"][0]))
+            if (
+                0 < start < timestamps.shape[0]
+                and timestamps[start] == candles["timestamp"][0]
+            ):
+                self.data = self._update(start, candles)
+                return dict(self.data)
+
+        # first tick or the stored window is stale so fetch the whole window
+        self.data = preprocess_arrays(
+            frame_to_arrays(
+                getOandaOHLC(
+                    ctx,
+                    count=self.chart_conf.candle_count,
+                    granularity=self.chart_conf.granularity,
+                )
+            ),
+            self.wma_period,
+            downcast=False,
+        )
+
+        return dict(self.data)
+
+    def _update(
+        self, start: int, candles: dict[str, NDArray[Any]]
+    ) -> dict[str, NDArray[Any]]:
+        """Replace the bars from start onwards with the candles."""
+        end = start + candles["timestamp"].shape[0]
+        data = {
+            col: np.concatenate(
+                (values[:start], candles[col])
+                if col in candles
+                else (values[:start], np.empty(end - start, dtype=values.dtype))
+            )
+            for col, values in self.data.items()
+        }
+
+        period = self.wma_period
+        weights = np.arange(1, period + 1, dtype=np.float64)
+        weights /= weights.sum()
+        for i in range(start, end):
+            # wilder's recurrence for the average true range
+            true_range = max(
+                data["high"][i] - data["low"][i],
+                abs(data["high"][i] - data["close"][i - 1]),
+                abs(data["low"][i] - data["close"][i - 1]),
+            )
+            data["atr"][i] = (data["atr"][i - 1] * (period - 1) + true_range) / period
+
+            # heikin ashi recurrence for the original, bid and ask prices
+            for prefix in ["", "bid_", "ask_"]:
+                ha_open = (
+                    data[f"ha_{prefix}open"][i - 1] + data[f"ha_{prefix}close"][i - 1]
+                ) / 2
+                ha_close = (
+                    data[f"{prefix}open"][i]
+                    + data[f"{prefix}high"][i]
+                    + data[f"{prefix}low"][i]
+                    + data[f"{prefix}close"][i]
+                ) / 4
+                data[f"ha_{prefix}open"][i] = ha_open
+                data[f"ha_{prefix}high"][i] = max(
+                    ha_open, ha_close, data[f"{prefix}high"][i]
+                )
+                data[f"ha_{prefix}low"][i] = min(
+                    ha_open, ha_close, data[f"{prefix}low"][i]
+                )
+                data[f"ha_{prefix}close"][i] = ha_close
+
+            # the wma of each new bar only needs the trailing period bars
+            for col in PRICE_COLUMNS:
+                data[f"wma_{col}"][i] = (
+                    data[col][i + 1 - period : i + 1] @ weights
+                    if i + 1 >= period
+                    else np.nan
+                )
+
+        # evict the oldest bars to keep the window size
+        evict = max(end - self.chart_conf.candle_count, 0)
+        return {col: values[evict:] for col, values in data.items()}
@@ -1,18 +1,36 @@
 """Backtest the trading strategy."""
 
 from datetime import datetime, timedelta
+from functools import lru_cache
+from hashlib import sha256
+from itertools import groupby
+import os
+from pathlib import Path
 import subprocess
-from typing import Any
+import tempfile
+from typing import Any, Generator, Iterable
 import numpy as np
-import pandas as pd
-import talib
 import v20  # type: ignore
-from numba import jit  # type: ignore
+from numba import (  # type: ignore
+    config,
+    float64,
+    jit,
+    prange,
+    set_num_threads,
+)
 from bot.common import BacktestResult, ChartConfig, SolverConfig
-from core.chart import heiken_ashi_numpy
+from core.calc import FLOAT_TYPES
+from core.chart import frame_to_arrays, preprocess_arrays
 from numpy.typing import NDArray
 
-from core.kernel import EdgeCategory, KernelConfig, kernel_stage_1, kernel
+from core.kernel import (
+    EdgeCategory,
+    FeatureColumn,
+    KernelConfig,
+    kernel,
+    kernel_exits,
+    kernel_signals,
+)
 from bot.exchange import (
     getOandaOHLC,
     OandaContext,
@@ -20,6 +38,10 @@ from bot.exchange import (
 
 import logging
 
+SOLVE_CHUNK_SIZE = 65536
+
+PREPROCESS_CACHE_DIR = Path.home() / ".cache" / "mutantbot" / "preprocess"
+
 
 def get_git_info() -> tuple[str, bool] | Exception:
     """Get commit hash and whether the working tree is clean.
@@ -28,182 +50,135 @@ def get_git_info() -> tuple[str, bool] | Exception:
     element is a boolean indicating whether the working tree is clean (i.e., there
     are no pending changes).
 
-    If there is an error (e.g., not in a Git repository), the function returns None.
+    The result describes the code loaded by this process so it is computed once and
+    cached for the lifetime of the process.
+
+    If there is an error (e.g., not in a Git repository), the function returns the
+    error and the lookup is retried on the next call.
     """
     try:
-        # Get commit hash
-        commit_hash = subprocess.check_output(
-            ["git", "rev-parse", "HEAD"], encoding="utf-8"
-        ).strip()
-
-        # Get porcelain status
-        porcelain_status = subprocess.check_output(
-            ["git", "status", "--porcelain"], encoding="utf-8"
-        ).strip()
-
-        return commit_hash, porcelain_status == ""
+        return _git_info()
     except subprocess.CalledProcessError as e:
         return e
 
 
-def preprocess(df: pd.DataFrame, wma_period: int) -> pd.DataFrame:
-    # calculate the ATR for the trailing stop loss
-    """Preprocess the DataFrame to calculate various technical indicators.
+@lru_cache(maxsize=1)
+def _git_info() -> tuple[str, bool]:
+    # Get commit hash
+    commit_hash = subprocess.check_output(
+        ["git", "rev-parse", "HEAD"], encoding="utf-8"
+    ).strip()
 
-    This function calculates the Average True Range (ATR), Weighted Moving Averages (WMA)
-    for open, high, low, and close prices, and Heikin-Ashi candlesticks for both original
-    and bid/ask prices in the given DataFrame.
+    # Get porcelain status
+    porcelain_status = subprocess.check_output(
+        ["git", "status", "--porcelain"], encoding="utf-8"
+    ).strip()
 
-    Parameters
-    ----------
-    df : pd.DataFrame
-        A DataFrame containing columns for open, high, low, close, ask, and bid prices.
-    wma_period : int
-        The period to be used for calculating the Weighted Moving Averages (WMA).
-    convert: bool
-        If True, convert the DataFrame to a dictionary of NumPy arrays.
+    return commit_hash, porcelain_status == ""
 
-    Returns
-    -------
-    pd.DataFrame
-        The input DataFrame with additional columns for ATR, WMA, and Heikin-Ashi
-        candlesticks.
 
+def _convert_to_features(data: dict[str, NDArray[Any]]) -> NDArray[np.float32]:
+    """Convert the arrays to a (n, k) matrix with columns indexed by FeatureColumn.
+
+    The matrix is column-major so that each column slice is contiguous.
     """
-    df["atr"] = talib.ATR(
-        df["high"].to_numpy(),
-        df["low"].to_numpy(),
-        df["close"].to_numpy(),
-        timeperiod=wma_period,
+    features = np.empty(
+        (data["atr"].shape[0], len(FeatureColumn)), dtype=np.float32, order="F"
     )
+    for col in FeatureColumn:
+        features[:, col] = data[col.name]
 
-    df["wma_open"] = talib.WMA(df["open"].to_numpy(), timeperiod=wma_period)
-    df["wma_high"] = talib.WMA(df["high"].to_numpy(), timeperiod=wma_period)
-    df["wma_low"] = talib.WMA(df["low"].to_numpy(), timeperiod=wma_period)
-    df["wma_close"] = talib.WMA(df["close"].to_numpy(), timeperiod=wma_period)
-
-    df["wma_ask_open"] = talib.WMA(df["ask_open"].to_numpy(), timeperiod=wma_period)
-    df["wma_ask_high"] = talib.WMA(df["ask_high"].to_numpy(), timeperiod=wma_period)
-    df["wma_ask_low"] = talib.WMA(df["ask_low"].to_numpy(), timeperiod=wma_period)
-    df["wma_ask_close"] = talib.WMA(df["ask_close"].to_numpy(), timeperiod=wma_period)
-
-    df["wma_bid_open"] = talib.WMA(df["bid_open"].to_numpy(), timeperiod=wma_period)
-    df["wma_bid_high"] = talib.WMA(df["bid_high"].to_numpy(), timeperiod=wma_period)
-    df["wma_bid_low"] = talib.WMA(df["bid_low"].to_numpy(), timeperiod=wma_period)
-    df["wma_bid_close"] = talib.WMA(df["bid_close"].to_numpy(), timeperiod=wma_period)
-
-    # calculate the Heikin-Ashi candlesticks
-    df["ha_open"], df["ha_high"], df["ha_low"], df["ha_close"] = heiken_ashi_numpy(
-        df["open"].to_numpy(),
-        df["high"].to_numpy(),
-        df["low"].to_numpy(),
-        df["close"].to_numpy(),
-    )
-    df["wma_ha_open"] = talib.WMA(df["ha_open"].to_numpy(), timeperiod=wma_period)
-    df["wma_ha_high"] = talib.WMA(df["ha_high"].to_numpy(), timeperiod=wma_period)
-    df["wma_ha_low"] = talib.WMA(df["ha_low"].to_numpy(), timeperiod=wma_period)
-    df["wma_ha_close"] = talib.WMA(df["ha_close"].to_numpy(), timeperiod=wma_period)
-
-    # calculate the Heikin-Ashi candlesticks for the bid prices
-    df["ha_bid_open"], df["ha_bid_high"], df["ha_bid_low"], df["ha_bid_close"] = (
-        heiken_ashi_numpy(
-            df["bid_open"].to_numpy(),
-            df["bid_high"].to_numpy(),
-            df["bid_low"].to_numpy(),
-            df["bid_close"].to_numpy(),
-        )
-    )
-    df["wma_ha_bid_open"] = talib.WMA(
-        df["ha_bid_open"].to_numpy(), timeperiod=wma_period
-    )
-    df["wma_ha_bid_high"] = talib.WMA(
-        df["ha_bid_high"].to_numpy(), timeperiod=wma_period
-    )
-    df["wma_ha_bid_low"] = talib.WMA(df["ha_bid_low"].to_numpy(), timeperiod=wma_period)
-    df["wma_ha_bid_close"] = talib.WMA(
-        df["ha_bid_close"].to_numpy(), timeperiod=wma_period
-    )
+    return features
 
-    # calculate the Heikin-Ashi candlesticks for the ask prices
-    df["ha_ask_open"], df["ha_ask_high"], df["ha_ask_low"], df["ha_ask_close"] = (
-        heiken_ashi_numpy(
-            df["ask_open"].to_numpy(),
-            df["ask_high"].to_numpy(),
-            df["ask_low"].to_numpy(),
-            df["ask_close"].to_numpy(),
-        )
-    )
-    df["wma_ha_ask_open"] = talib.WMA(
-        df["ha_ask_open"].to_numpy(), timeperiod=wma_period
-    )
-    df["wma_ha_ask_high"] = talib.WMA(
-        df["ha_ask_high"].to_numpy(), timeperiod=wma_period
-    )
-    df["wma_ha_ask_low"] = talib.WMA(df["ha_ask_low"].to_numpy(), timeperiod=wma_period)
-    df["wma_ha_ask_close"] = talib.WMA(
-        df["ha_ask_close"].to_numpy(), timeperiod=wma_period
-    )
 
-    return df
+def _head(data: dict[str, NDArray[Any]], count: int) -> dict[str, NDArray[Any]]:
+    """Get the first count rows of each array."""
+    return {col: values[:count] for col, values in data.items()}
 
 
-def _convert_to_dict(df: pd.DataFrame) -> dict[str, NDArray[np.float64]]:
-    result_dict: dict[str, NDArray[np.float64]] = {}
-    for k, v in df.to_dict("series").items():
-        result_dict[str(k)] = v.to_numpy()
-    return result_dict
+def _tail(data: dict[str, NDArray[Any]], count: int) -> dict[str, NDArray[Any]]:
+    """Get the last count rows of each array."""
+    return {
+        col: values[max(values.shape[0] - count, 0) :] for col, values in data.items()
+    }
 
 
 def _solve_run(
-    kernel_conf: KernelConfig,
-    df: dict[str, NDArray[Any]],
-    ask_data: NDArray[Any],
-    atr: NDArray[Any],
-) -> tuple[np.float64, np.float64, np.int64, np.int64, np.float64] | None:
-    # run the backtest
-    should_roll = (
-        "open" not in kernel_conf.source_column
-        and kernel_conf.edge != EdgeCategory.Deterministic
-    )
-    wma = df[f"wma_{kernel_conf.source_column}"]
-    (
-        _,
-        _,
-        _,
-        exit_value,
-        exit_total,
-        _,
-    ) = kernel_stage_1(
-        df[kernel_conf.signal_buy_column],
-        df[kernel_conf.signal_exit_column],
-        wma,
-        ask_data,
-        df[kernel_conf.bid_column],
-        atr,
-        kernel_conf.take_profit,
-        kernel_conf.stop_loss,
-        kernel_conf.signal_buy_column != kernel_conf.signal_exit_column,
-        should_roll,
-        kernel_conf.edge == EdgeCategory.Quasi,
+    batches: list[list[KernelConfig]],
+    features: NDArray[np.float32],
+    take_profit_thresholds: tuple[NDArray[np.float32], dict[float, int]],
+    stop_loss_thresholds: tuple[NDArray[np.float32], dict[float, int]],
+) -> NDArray[np.float64]:
+    """Run the backtests for a chunk of batches of kernel configurations.
+
+    All configurations in a batch must share the same signal and source columns
+    so that the signals are only generated once per batch. Each row of the result
+    contains the final total, min total, wins, losses and ratio of the
+    configuration, in the order of the batches, or NaN if the configuration was
+    rejected.
+    """
+    first_confs = [batch[0] for batch in batches]
+    take_profits, take_profit_rows = take_profit_thresholds
+    stop_losses, stop_loss_rows = stop_loss_thresholds
+
+    return _solve_batches(  # type: ignore
+        features,
+        np.array(
+            [
+                [
+                    kc.signal_buy_index,
+                    kc.signal_exit_index,
+                    kc.wma_index,
+                    kc.ask_index,
+                    kc.bid_index,
+                ]
+                for kc in first_confs
+            ],
+            dtype=np.int64,
+        ),
+        np.array(
+            [[kc.use_exit, kc.should_roll, kc.is_quasi] for kc in first_confs],
+            dtype=np.bool_,
+        ),
+        np.cumsum([0, *(len(batch) for batch in batches)]),
+        np.array(
+            [
+                take_profit_rows.get(kc.take_profit, -1)
+                for batch in batches
+                for kc in batch
+            ],
+            dtype=np.int64,
+        ),
+        np.array(
+            [stop_loss_rows.get(kc.stop_loss, -1) for batch in batches for kc in batch],
+            dtype=np.int64,
+        ),
+        take_profits,
+        stop_losses,
     )
 
-    result = _stats(exit_value, exit_total)
-
-    return result  # type: ignore
 
-
-@jit(nopython=True)  # type: ignore
+@jit([(f[:], f[:]) for f in FLOAT_TYPES], nopython=True, cache=True)  # type: ignore
 def _stats(
     exit_value: NDArray[Any], exit_total: NDArray[Any]
 ) -> tuple[np.float64, np.float64, np.int64, np.int64, np.float64] | None:
     final_total = exit_total[-1] if exit_total[-1] > 0 else np.float64(0.0)
-    min_total = exit_total.min()
-    max_total = exit_total.max()
-    if final_total <= 0.0 or max_total < abs(min_total):
+    if final_total <= 0.0:
+        return None
+
+    # gather the extremes and the win/loss counts in a single pass
+    min_total = exit_total[0]
+    max_total = exit_total[0]
+    wins = np.int64(0)
+    losses = np.int64(0)
+    for i in range(exit_value.shape[0]):
+        wins += exit_value[i] > 0
+        losses += exit_value[i] < 0
+        min_total = min(min_total, exit_total[i])
+        max_total = max(max_total, exit_total[i])
+    if max_total < abs(min_total):
         return None
 
-    wins: np.int64 = np.where(exit_value > 0, 1, 0).astype(np.int64).sum()
-    losses: np.int64 = np.where(exit_value < 0, 1, 0).astype(np.int64).sum()
     ratio = (
         np.float64(wins / (wins + losses)) if (wins + losses) > 0 else np.float64(0.0)
     )
@@ -211,6 +186,82 @@ def _stats(
     return final_total, min_total, wins, losses, ratio
 
 
+# compiled lazily on the first solve and not cached on disk, numba compiles the
+# unpinned kernel.py kernels into this function and its cache would not notice
+# edits to them
+@jit(nopython=True, parallel=True)  # type: ignore
+def _solve_batches(  # noqa: PLR0913, PLR0917
+    features: NDArray[np.float32],
+    columns: NDArray[np.int64],
+    flags: NDArray[np.bool_],
+    offsets: NDArray[np.int64],
+    take_profit_rows: NDArray[np.int64],
+    stop_loss_rows: NDArray[np.int64],
+    take_profits: NDArray[np.float32],
+    stop_losses: NDArray[np.float32],
+) -> NDArray[np.float64]:
+    no_threshold = np.empty(0, dtype=take_profits.dtype)
+    results = np.full((len(take_profit_rows), 5), np.nan)
+    for g in prange(len(columns)):
+        signal, trigger = kernel_signals(
+            features[:, columns[g, 0]],
+            features[:, columns[g, 1]],
+            features[:, columns[g, 2]],
+            flags[g, 0],
+            flags[g, 1],
+        )
+        ask_data = features[:, columns[g, 3]]
+        bid_data = features[:, columns[g, 4]]
+
+        for b in range(offsets[g], offsets[g + 1]):
+            # erasing trades modifies the signal so each backtest needs its own copy
+            _, _, _, exit_value, exit_total, _ = kernel_exits(
+                signal.copy(),
+                trigger.copy(),
+                ask_data,
+                bid_data,
+                take_profits[take_profit_rows[b]]
+                if take_profit_rows[b] >= 0
+                else no_threshold,
+                stop_losses[stop_loss_rows[b]]
+                if stop_loss_rows[b] >= 0
+                else no_threshold,
+                flags[g, 2],
+            )
+            result = _stats(exit_value, exit_total)
+            if result is not None:
+                (
+                    results[b, 0],
+                    results[b, 1],
+                    results[b, 2],
+                    results[b, 3],
+                    results[b, 4],
+                ) = result
+
+    return results
+
+
+@jit([(float64[:, :], float64, float64)], nopython=True, cache=True)  # type: ignore
+def _select_best(
+    results: NDArray[np.float64],
+    best_exit_total: np.float64,
+    best_ratio: np.float64,
+) -> tuple[int, int]:
+    # scan in order so that ties resolve to the last matching configuration
+    found = 0
+    best = -1
+    for b in range(results.shape[0]):
+        if np.isnan(results[b, 0]):
+            continue
+        found += 1
+        if results[b, 4] >= best_ratio and results[b, 0] >= best_exit_total:
+            best = b
+            best_exit_total = results[b, 0]
+            best_ratio = results[b, 4]
+
+    return found, best
+
+
 def solve(
     chart_config: ChartConfig,
     kernel_conf_in: KernelConfig,
@@ -251,14 +302,14 @@ def solve(
     logger.info("git info: %s %s", git_info[0], git_info[1])
 
     # get data and preprocess
-    orig_df = preprocess(
-        _get_data(chart_config, token, logger), kernel_conf_in.wma_period
+    data = _get_preprocessed(
+        chart_config, token, logger, kernel_conf_in.wma_period, git_info
     )
 
-    # convert to dict for speed
-    df = _convert_to_dict(orig_df)
+    # convert to a feature matrix for speed
+    features = _convert_to_features(data)
     best_result = _find_max(
-        df,
+        features,
         logger,
         backtest_config,
         chart_config,
@@ -284,19 +335,22 @@ def segmented_solve(
     logger.info("git info: %s %s", git_info[0], git_info[1])
 
     # get data and preprocess
-    orig_df = preprocess(
-        _get_data(chart_config, token, logger), kernel_conf_in.wma_period
+    data = _get_preprocessed(
+        chart_config, token, logger, kernel_conf_in.wma_period, git_info
     )
 
-    orig_df_train = orig_df.head(solver_config.train_size)
-    orig_df_tp_train = orig_df_train.tail(solver_config.sample_size)
-    orig_df_sample = orig_df.tail(solver_config.sample_size)
-    df_train = _convert_to_dict(orig_df_train)
-    df_tp_train = _convert_to_dict(orig_df_tp_train)
-    df_sample = _convert_to_dict(orig_df_sample)
+    data_train = _head(data, solver_config.train_size)
+    data_tp_train = _tail(data_train, solver_config.sample_size)
+    data_sample = _tail(data, solver_config.sample_size)
+    features_train = _convert_to_features(data_train)
+    features_tp_train = _convert_to_features(data_tp_train)
+    features_sample = _convert_to_features(data_sample)
+
+    # the cached arrays are read-only and the pinned kernels only take writable ones
+    kernel_sample = {col: values.copy() for col, values in data_sample.items()}
 
     raw_zk_result = _find_max(
-        df_train,
+        features_train,
         logger,
         solver_config,
         chart_config,
@@ -306,14 +360,14 @@ def segmented_solve(
     if raw_zk_result is None:
         logger.error("failed to find best result")
         return 0.0, 0.0, 0.0
-    df = kernel(orig_df_sample.copy(), raw_zk_result.kernel_conf)
-    raw_zk_bet = df.iloc[-1].exit_total
+    result = kernel(dict(kernel_sample), raw_zk_result.kernel_conf)
+    raw_zk_bet = float(result["exit_total"][-1])
     if np.isnan(raw_zk_bet):
         raw_zk_bet = 0.0
 
     logger.info("best result: %s", raw_zk_result)
     refined_result_zk = _find_max(
-        df_tp_train,
+        features_tp_train,
         logger,
         solver_config,
         chart_config,
@@ -321,8 +375,8 @@ def segmented_solve(
     )
     if refined_result_zk is not None:
         logger.info("refined zero knowledge result: %s", refined_result_zk)
-        df = kernel(orig_df_sample.copy(), refined_result_zk.kernel_conf)
-        zk_bet = df.iloc[-1].exit_total
+        result = kernel(dict(kernel_sample), refined_result_zk.kernel_conf)
+        zk_bet = float(result["exit_total"][-1])
     else:
         logger.error("failed to find refined zero knowledge result")
         zk_bet = 0.0
@@ -330,7 +384,7 @@ def segmented_solve(
             zk_bet = 0.0
 
     result_pk = _find_max(
-        df_sample,
+        features_sample,
         logger,
         solver_config,
         chart_config,
@@ -338,8 +392,8 @@ def segmented_solve(
     )
     if result_pk is not None:
         logger.info("perfect knowledge result: %s", result_pk)
-        df = kernel(orig_df_sample.copy(), result_pk.kernel_conf)
-        pk_bet = df.iloc[-1].exit_total
+        result = kernel(dict(kernel_sample), result_pk.kernel_conf)
+        pk_bet = float(result["exit_total"][-1])
         if np.isnan(pk_bet):
             pk_bet = 0.0
     else:
@@ -357,7 +411,7 @@ def segmented_solve(
 
 
 def _find_max(
-    df: dict[str, NDArray[Any]],
+    features: NDArray[np.float32],
     logger: logging.Logger,
     solver_config: SolverConfig,
     chart_config: ChartConfig,
@@ -368,48 +422,59 @@ def _find_max(
     total_found = 0
     count = 0
     filter_start_time = datetime.now()
-    atr = df["atr"]
-    ask = df["ask_close"]
+    atr = features[:, FeatureColumn["atr"]]
+    if solver_config.num_threads > 0:
+        # numba sets its config attributes at runtime so mypy cannot see them
+        max_threads: int = config.NUMBA_NUM_THREADS  # type: ignore[attr-defined]
+        set_num_threads(min(solver_config.num_threads, max_threads))
+
+    # the thresholds only depend on the atr so compute them once per multiplier
+    take_profit_thresholds = _get_thresholds(solver_config.take_profit, atr)
+    stop_loss_thresholds = _get_thresholds(solver_config.stop_loss, -atr)
 
     # run all combinations
-    configs, num_configs = solver_config.get_configs(kernel_conf_in)
+    configs, num_configs = solver_config.get_configs(
+        kernel_conf_in,
+        EdgeCategory[solver_config.force_edge]
+        if solver_config.force_edge != ""
+        else None,
+    )
     logger.info(f"total_combinations: {num_configs}")
-    for kernel_conf in configs:
-        # log progress
-        count = _log_progress(
-            logger, num_configs, total_found, count, filter_start_time
-        )
-
-        # filter if needed
-        if (
-            solver_config.force_edge != ""
-            and EdgeCategory[solver_config.force_edge] != kernel_conf.edge
-        ):
-            continue
+    logger.info("starting pass")
+    for batches in _chunk_batches(configs):
+        kernel_confs = [kc for batch in batches for kc in batch]
 
         # run
-        result = _solve_run(kernel_conf, df, ask, atr)
-        if result is None:
-            continue
+        results = _solve_run(
+            batches,
+            features,
+            take_profit_thresholds,
+            stop_loss_thresholds,
+        )
 
         # update best
-        total_found += 1
-        et, _, wins, losses, ratio = result
-        if (
-            best_result is None
-            or (ratio >= best_result.ratio)
-            and (et >= best_result.exit_total)
-        ):
+        found, best = _select_best(
+            results,
+            np.float64(-np.inf if best_result is None else best_result.exit_total),
+            np.float64(-np.inf if best_result is None else best_result.ratio),
+        )
+        total_found += found
+        if best >= 0:
+            et, _, wins, losses, ratio = results[best]
             best_result = BacktestResult(
                 chart_config.instrument,
-                kernel_conf,
+                kernel_confs[best],
                 et,
                 np.float64(ratio),
-                wins,
-                losses,
+                np.int64(wins),
+                np.int64(losses),
             )
             logger.debug(best_result)
 
+        # log progress, every chunk spans many thousands of configurations
+        count += len(kernel_confs)
+        _log_progress(logger, num_configs, total_found, count, filter_start_time)
+
     logger.info("total_found: %s", total_found)
     if total_found == 0:
         logger.error("no combinations found")
@@ -418,31 +483,191 @@ def _find_max(
     return best_result
 
 
+def _chunk_batches(
+    configs: Iterable[KernelConfig],
+) -> Generator[list[list[KernelConfig]]]:
+    """Group the configs into batches and yield chunks of batches.
+
+    A batch holds consecutive configs that share the same signal and source columns.
+    Each chunk holds about SOLVE_CHUNK_SIZE configs, which bounds the memory used
+    while keeping every core busy.
+    """
+    chunk: list[list[KernelConfig]] = []
+    chunk_size = 0
+    batches = groupby(
+        configs,
+        key=lambda kc: (
+            kc.signal_buy_column,
+            kc.signal_exit_column,
+            kc.source_column,
+        ),
+    )
+    for _, batch in batches:
+        chunk.append(list(batch))
+        chunk_size += len(chunk[-1])
+        if chunk_size >= SOLVE_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+            chunk_size = 0
+
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _get_thresholds(
+    multipliers: list[float], atr: NDArray[np.float32]
+) -> tuple[NDArray[np.float32], dict[float, int]]:
+    """Precompute the atr multiple of each positive multiplier.
+
+    Returns the (m, n) threshold matrix and the row of each multiplier. Multipliers
+    that are not positive have no row as they disable the exit strategy.
+    """
+    rows = {m: i for i, m in enumerate(m for m in dict.fromkeys(multipliers) if m > 0)}
+    thresholds = np.empty((len(rows), len(atr)), dtype=np.float32)
+    for m, i in rows.items():
+        thresholds[i] = m * atr.astype(np.float64)
+    return thresholds, rows
+
+
 def _log_progress(
     logger: logging.Logger,
     column_pair_len: int,
     total_found: int,
     count: int,
     start_time: datetime,
-) -> int:
-    if count == 0:
-        logger.info("starting pass")
-    count += 1
-    if count % 10000 == 0:
-        time_now = datetime.now()
-        time_diff = time_now - start_time
-        throughput = count / time_diff.total_seconds()
-        remaining = timedelta(seconds=(column_pair_len - count) / throughput)
-        logger.debug(
-            "heartbeat: %s %s%% %s/%s %s/s %s remaining",
-            total_found,
-            round(100 * count / column_pair_len, 2),
-            count,
-            column_pair_len,
-            round(throughput, 2),
-            remaining,
+) -> None:
+    time_now = datetime.now()
+    time_diff = time_now - start_time
+    throughput = count / time_diff.total_seconds()
+    remaining = timedelta(seconds=(column_pair_len - count) / throughput)
+    logger.debug(
+        "heartbeat: %s %s%% %s/%s %s/s %s remaining",
+        total_found,
+        round(100 * count / column_pair_len, 2),
+        count,
+        column_pair_len,
+        round(throughput, 2),
+        remaining,
+    )
+
+
+def _get_preprocessed(
+    chart_config: ChartConfig,
+    token: str,
+    logger: logging.Logger,
+    wma_period: int,
+    git_info: tuple[str, bool],
+) -> dict[str, NDArray[Any]]:
+    """Get data from Oanda and preprocess it.
+
+    Historical charts (those with a date_from) are cached in memory, and on disk
+    once their window is full and its last candle has closed. Charts of the latest
+    candles are always fetched again.
+
+    Parameters
+    ----------
+    chart_config : ChartConfig
+        The configuration for the chart.
+    token : str
+        The Oanda API token.
+    logger : logging.Logger
+        The logger to use.
+    wma_period : int
+        The period to be used for calculating the Weighted Moving Averages (WMA).
+    git_info : tuple[str, bool]
+        The commit hash and whether the working tree is clean. The cache is keyed on
+        the commit hash and the disk cache is bypassed for dirty working trees.
+
+    Returns
+    -------
+    dict[str, NDArray[Any]]
+        The preprocessed arrays.
+
+    """
+    if chart_config.date_from is None:
+        return preprocess_arrays(_get_data(chart_config, token, logger), wma_period)
+
+    key = (
+        chart_config.instrument,
+        chart_config.granularity,
+        chart_config.date_from.isoformat(),
+        chart_config.candle_count,
+        wma_period,
+    )
+    # copy the dictionary so that callers cannot add or replace cached arrays
+    return dict(_cached_preprocess(key, git_info, token))
+
+
+@lru_cache(maxsize=32)
+def _cached_preprocess(
+    key: tuple[str, str, str, int, int],
+    git_info: tuple[str, bool],
+    token: str,
+) -> dict[str, NDArray[Any]]:
+    # the key is (instrument, granularity, date_from, candle_count, wma_period)
+    logger = logging.getLogger("solve")
+    instrument, granularity, date_from, candle_count, wma_period = key
+    commit_hash, is_clean = git_info
+    name = "|".join(str(part) for part in key)
+    path = (
+        PREPROCESS_CACHE_DIR
+        / f"{sha256(f'{name}|{commit_hash}'.encode()).hexdigest()}.npz"
+    )
+    if is_clean and path.exists():
+        logger.info("using cached data: %s", name)
+        with np.load(path) as npz:
+            data = {col: npz[col] for col in npz.files}
+    else:
+        chart_config = ChartConfig(
+            instrument, granularity, candle_count, datetime.fromisoformat(date_from)
         )
-    return count
+        data = preprocess_arrays(_get_data(chart_config, token, logger), wma_period)
+
+        # a window reaching past now is short or still has a forming candle
+        if is_clean and _is_complete(data["timestamp"], candle_count):
+            _save_preprocessed(path, data)
+        elif is_clean:
+            logger.info("not caching incomplete data: %s", name)
+
+    # every cache hit shares these arrays so in-place writes must fail loudly
+    for values in data.values():
+        values.flags.writeable = False
+
+    return data
+
+
+def _is_complete(timestamps: NDArray[Any], candle_count: int) -> bool:
+    """Return whether the chart window is full and its last candle has closed.
+
+    The candle length is taken from the spacing of the last two candles.
+    """
+    if timestamps.shape[0] != candle_count or candle_count <= 1:
+        return False
+
+    last = datetime.fromisoformat(str(timestamps[-1]))
+    previous = datetime.fromisoformat(str(timestamps[-2]))
+    return last + (last - previous) <= datetime.now(tz=last.tzinfo)
+
+
+def _save_preprocessed(path: Path, data: dict[str, NDArray[Any]]) -> None:
+    """Write the preprocessed arrays to the disk cache.
+
+    The arrays are written to a temporary file that is then moved into place, so
+    an interrupted write never leaves a truncated cache file behind.
+    """
+    PREPROCESS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    arrays: dict[str, Any] = {
+        col: values.astype(str) if col == "timestamp" else values
+        for col, values in data.items()
+    }
+    fd, tmp_name = tempfile.mkstemp(dir=PREPROCESS_CACHE_DIR, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            np.savez(tmp_file, **arrays)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
 
 
 def _get_data(
@@ -450,8 +675,8 @@ def _get_data(
     token: str,
     logger: logging.Logger,
     instrument: str | None = None,
-) -> pd.DataFrame:
-    """Get data from Oanda and return it as a DataFrame.
+) -> dict[str, NDArray[Any]]:
+    """Get data from Oanda and return it as a dictionary of arrays.
 
     Parameters
     ----------
@@ -466,8 +691,8 @@ def _get_data(
 
     Returns
     -------
-    pd.DataFrame
-        The DataFrame containing the data.
+    dict[str, NDArray[Any]]
+        The arrays containing the data keyed by column name.
 
     """
     ctx = OandaContext(
@@ -489,4 +714,4 @@ def _get_data(
         chart_config.granularity,
     )
 
-    return orig_df
+    return frame_to_arrays(orig_df)
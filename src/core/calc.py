@@ -3,15 +3,19 @@
 from typing import Any
 import numpy as np
 from numpy.typing import NDArray
-from numba import jit  # type: ignore
+from numba import float32, float64, int64, jit  # type: ignore
 
+# the solver runs on float32 features and the live bot on float64 prices, pin
+# both so that neither recompiles and the compiled kernels are cached on disk
+FLOAT_TYPES = (float32, float64)
 
-@jit(nopython=True)  # type: ignore
+
+@jit([(f[:], int64[::1], int64[::1]) for f in FLOAT_TYPES], nopython=True, cache=True)  # type: ignore
 def exit_total(
-    position_value: NDArray[np.float64],
+    position_value: NDArray[Any],
     trigger: NDArray[np.int64],
     signal: NDArray[np.int64],
-) -> tuple[NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]:
+) -> tuple[NDArray[Any], NDArray[Any], NDArray[Any]]:
     """Calculate the cumulative total of all trades and the running total of the portfolio.
 
     Parameters
@@ -25,7 +29,7 @@ def exit_total(
 
     Returns
     -------
-    tuple[NDArray[np.float64], NDArray[np.float64]]
+    tuple[NDArray[Any], NDArray[Any], NDArray[Any]]
         A tuple containing the 'exit_value', 'exit_total' and 'running_total' arrays.
 
     Notes
@@ -33,19 +37,30 @@ def exit_total(
     The 'exit_total' array is the cumulative total of all trades, and the 'running_total' array
     is the cumulative total of the portfolio, including the current trade.
 
+    All three arrays are filled in a single pass. The running total is float64 as
+    the position value is promoted by the int64 signal.
+
     """
-    exit_value = np.where(trigger == -1, position_value, 0)
-    exit_total = np.cumsum(exit_value)
-    running_total = exit_total + position_value * signal
+    n = position_value.shape[0]
+    exit_value = np.empty_like(position_value)
+    exit_total = np.empty_like(position_value)
+    running_total = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        exit_value[i] = position_value[i] if trigger[i] == -1 else 0
+        exit_total[i] = exit_total[i - 1] + exit_value[i] if i > 0 else exit_value[i]
+        running_total[i] = exit_total[i] + position_value[i] * signal[i]
     return exit_value, exit_total, running_total
 
 
-@jit(nopython=True)  # type: ignore
+@jit(
+    [(f[:], f[:], int64[::1], int64[::1]) for f in FLOAT_TYPES],
+    nopython=True,
+    cache=True,
+)  # type: ignore
 def take_profit(
     position_value: NDArray[Any],
-    atr: NDArray[Any],
+    take_profit_threshold: NDArray[Any],
     signal: NDArray[Any],
-    take_profit_value: float,
     trigger: NDArray[Any],
 ) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
     """Apply a take profit strategy to trading signals.
@@ -54,14 +69,12 @@ def take_profit(
     ----------
     position_value : np.ndarray
         The array of position values.
-    atr : np.ndarray
-        The array of average true range (atr).
+    take_profit_threshold : np.ndarray
+        The array of take profit thresholds, the atr times the take profit value.
     signal : np.ndarray
         The array of trading signals.
     trigger : np.ndarray
         The array of trigger values.
-    take_profit_value : float
-        The take profit value as a multiplier of the atr.
 
     Returns
     -------
@@ -71,88 +84,82 @@ def take_profit(
     Notes
     -----
     The 'signal' array is set to 0 where the 'position_value' array is greater than the
-    'atr' array times the take profit value. The 'trigger' array is set to the difference
+    'take_profit_threshold' array. The 'trigger' array is set to the difference
     between the 'signal' array and the previous value of the 'signal' array.
 
-    """
-    take_profit_array = take_profit_value * atr
-    signal = np.where((position_value > take_profit_array) & (trigger != 1), 0, signal)
-    trigger = np.diff(signal)
-    trigger = np.concatenate((np.zeros(1), trigger))
-    return signal.astype(np.int64), trigger.astype(np.int64)
-
+    Both arrays are updated in place in a single pass.
 
-@jit(nopython=True)  # type: ignore
+    """
+    previous = 0
+    for i in range(signal.shape[0]):
+        current = signal[i]
+        if position_value[i] > take_profit_threshold[i] and trigger[i] != 1:
+            current = 0
+        trigger[i] = current - previous if i > 0 else 0
+        signal[i] = current
+        previous = current
+    return signal, trigger
+
+
+@jit(
+    [(f[:], f[:], int64[::1], int64[::1]) for f in FLOAT_TYPES],
+    nopython=True,
+    cache=True,
+)  # type: ignore
 def stop_loss(
     position_value: NDArray[Any],
-    atr: NDArray[Any],
+    stop_loss_threshold: NDArray[Any],
     signal: NDArray[Any],
-    stop_loss_value: float,
     trigger: NDArray[Any],
 ) -> tuple[NDArray[Any], NDArray[Any]]:
     """Apply a stop loss strategy to trading signals.
 
-    This function takes arrays of position values, average true range (atr), signals,
-    and a stop loss multiplier to determine when to stop out of trades. If the position
-    value falls below the stop loss threshold, the signal is set to 0. The function
-    calculates the trigger as the difference between consecutive signal values.
+    This function takes arrays of position values, stop loss thresholds and signals
+    to determine when to stop out of trades. If the position value falls below the
+    stop loss threshold, the signal is set to 0. The function calculates the trigger
+    as the difference between consecutive signal values.
 
     Parameters
     ----------
     position_value : NDArray[Any]
         Numpy array containing the position values.
-    atr : NDArray[Any]
-        Numpy array containing the average true range values.
+    stop_loss_threshold : NDArray[Any]
+        Numpy array containing the stop loss thresholds, the negated atr times the
+        stop loss value.
     signal : NDArray[Any]
         Numpy array containing the trading signals.
     trigger: NDArray[Any]
         Numpy array containing the triggers.
-    stop_loss_value : float
-        The stop loss value as a multiplier of the atr.
 
     Returns
     -------
     tuple[NDArray[Any], NDArray[Any]]
-        A tuple containing the updated signal and the trigger arrays.
-
-    """
-    stop_loss_array = -stop_loss_value * atr
-    signal = np.where(position_value < stop_loss_array, 0, signal)
-    trigger = np.diff(signal)
-    trigger = np.concatenate((np.zeros(1), trigger))
-    return signal.astype(np.int64), trigger.astype(np.int64)
-
-
-@jit(nopython=True)  # type: ignore
-def forward_fill(arr: NDArray[Any]) -> NDArray[Any]:
-    """Forward fills NaN values in a 1D NumPy array.
-
-    Parameters
-    ----------
-    arr : np.ndarray
-        A 1D NumPy array containing potentially NaN values.
-
-    Returns
-    -------
-        np.ndarray: A new 1D NumPy array with NaN values forward filled.
+        A tuple containing the updated signal and the trigger arrays. Both arrays
+        are updated in place in a single pass.
 
     """
-    last_valid = np.nan
-    result = np.empty_like(arr)
-    for i in range(arr.shape[0]):
-        if not np.isnan(arr[i]):
-            last_valid = arr[i]
-        result[i] = last_valid
-    return result
-
-
-@jit(nopython=True)  # type: ignore
+    previous = 0
+    for i in range(signal.shape[0]):
+        current = signal[i]
+        if position_value[i] < stop_loss_threshold[i]:
+            current = 0
+        trigger[i] = current - previous if i > 0 else 0
+        signal[i] = current
+        previous = current
+    return signal, trigger
+
+
+@jit(
+    [(f[:], f[:], int64[::1], int64[::1]) for f in FLOAT_TYPES],
+    nopython=True,
+    cache=True,
+)  # type: ignore
 def entry_price(
-    entry: NDArray[np.float64],
-    exit: NDArray[np.float64],
+    entry: NDArray[Any],
+    exit: NDArray[Any],
     signal: NDArray[np.int64],
     trigger: NDArray[np.int64],
-) -> NDArray[np.float64]:
+) -> NDArray[Any]:
     """Calculate the entry price for a given trading signal.
 
     Parameters
@@ -168,13 +175,26 @@ def entry_price(
 
     Returns
     -------
-    tuple[np.ndarray, np.ndarray, np.ndarray]
-        A tuple containing the internal bit mask, exit price, and position value arrays.
+    np.ndarray
+        The position value array.
 
-    """
-    internal_bit_mask = np.logical_or(signal, trigger)
-    entry_price = np.where(trigger == 1, entry, np.nan)
-    entry_price = forward_fill(entry_price) * internal_bit_mask
-    position_value = (exit - entry_price) * internal_bit_mask
+    Notes
+    -----
+    The entry price of each buy trigger is carried forward and the position value
+    is computed in the same pass. Rows without a signal or trigger have a zero
+    position value, or NaN if there is no entry or exit price yet.
 
-    return position_value.astype(np.float64)  # type: ignore
+    """
+    position_value = np.empty_like(exit)
+    last_entry = np.nan
+    for i in range(entry.shape[0]):
+        if trigger[i] == 1 and not np.isnan(entry[i]):
+            last_entry = entry[i]
+        if signal[i] != 0 or trigger[i] != 0:
+            position_value[i] = exit[i] - last_entry
+        else:
+            # no position, only carry the NaN of a missing entry or exit price
+            value = exit[i] - last_entry
+            position_value[i] = np.nan if np.isnan(value) else 0.0
+
+    return position_value  # type: ignore
@@ -3,27 +3,204 @@
 import typing
 import pandas as pd
 import numpy as np
+import talib
 from numba import jit  # type: ignore
+from scipy.ndimage import correlate1d  # type: ignore
 from typing import Any
 from numpy.typing import NDArray
 
+from core.kernel import PRICE_COLUMNS
 
-@jit(nopython=True)  # type: ignore
-def heiken_ashi_numpy(
+WMA_COLUMNS = [col for col in PRICE_COLUMNS if not col.startswith("ha_")]
+
+
+@jit(nopython=True, fastmath=True)  # type: ignore
+def ha_wma(
     c_open: NDArray[Any],
     c_high: NDArray[Any],
     c_low: NDArray[Any],
     c_close: NDArray[Any],
-) -> tuple[NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]]:
-    """Generate Heikin Ashi candlesticks for a given numpy arrays."""
-    ha_close = (c_open + c_high + c_low + c_close) / 4
-    ha_open = np.empty_like(ha_close)
-    ha_open[0] = (c_open[0] + c_close[0]) / 2
-    for i in range(1, len(c_close)):
-        ha_open[i] = (ha_open[i - 1] + ha_close[i - 1]) / 2
-    ha_high = np.maximum(np.maximum(ha_open, ha_close), c_high)
-    ha_low = np.minimum(np.minimum(ha_open, ha_close), c_low)
-    return ha_open, ha_high, ha_low, ha_close
+    period: int,
+) -> tuple[
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+    NDArray[np.float64],
+]:
+    """Generate Heikin Ashi candlesticks and their weighted moving averages.
+
+    The candlesticks and the WMA of each candlestick column are produced in a
+    single pass. Each WMA is maintained with the O(1) running sum recurrence
+    S += x * period - T; T += x - x[i - period] so the candlesticks are never
+    re-read by a separate WMA pass. The leading period - 1 WMA entries are NaN
+    to match talib.
+
+    Parameters
+    ----------
+    c_open : NDArray[Any]
+        The open prices.
+    c_high : NDArray[Any]
+        The high prices.
+    c_low : NDArray[Any]
+        The low prices.
+    c_close : NDArray[Any]
+        The close prices.
+    period : int
+        The period of the weighted moving average.
+
+    Returns
+    -------
+    tuple[NDArray[np.float64], ...]
+        The Heikin Ashi open, high, low and close arrays followed by the WMA of
+        each of them.
+
+    """
+    n = len(c_close)
+    ha = np.empty((4, n), dtype=np.float64)
+    wma = np.empty((4, n), dtype=np.float64)
+    weighted_sum = np.zeros(4, dtype=np.float64)
+    window_sum = np.zeros(4, dtype=np.float64)
+    divisor = period * (period + 1) / 2
+
+    for i in range(n):
+        # heikin ashi
+        ha_close = (c_open[i] + c_high[i] + c_low[i] + c_close[i]) / 4
+        if i == 0:
+            ha_open = (c_open[0] + c_close[0]) / 2
+        else:
+            ha_open = (ha[0, i - 1] + ha[3, i - 1]) / 2
+        ha[0, i] = ha_open
+        ha[1, i] = max(ha_open, ha_close, c_high[i])
+        ha[2, i] = min(ha_open, ha_close, c_low[i])
+        ha[3, i] = ha_close
+
+        # running weighted moving average of each heikin ashi column
+        for j in range(4):
+            x = ha[j, i]
+            if i < period:
+                weighted_sum[j] += (i + 1) * x
+                window_sum[j] += x
+            else:
+                weighted_sum[j] += x * period - window_sum[j]
+                window_sum[j] += x - ha[j, i - period]
+            wma[j, i] = weighted_sum[j] / divisor if i >= period - 1 else np.nan
+
+    return ha[0], ha[1], ha[2], ha[3], wma[0], wma[1], wma[2], wma[3]
+
+
+def wma_numpy(src: NDArray[Any], period: int) -> NDArray[np.float64]:
+    """Calculate the weighted moving average of each row of a 2D array.
+
+    All rows are filtered in a single pass instead of one talib.WMA call per
+    column. The leading period - 1 entries of each row are NaN to match talib.
+
+    Parameters
+    ----------
+    src : NDArray[Any]
+        A (k, n) array where each row is a series to be averaged.
+    period : int
+        The period of the weighted moving average.
+
+    Returns
+    -------
+    NDArray[np.float64]
+        A (k, n) array containing the weighted moving averages.
+
+    """
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    weights /= weights.sum()
+
+    # the origin shifts the window so that it trails the current sample
+    result: NDArray[np.float64] = correlate1d(
+        np.asarray(src, dtype=np.float64),
+        weights,
+        axis=1,
+        mode="nearest",
+        origin=(period - 1) // 2,
+    )
+    result[:, : period - 1] = np.nan
+    return result
+
+
+def frame_to_arrays(df: pd.DataFrame) -> dict[str, NDArray[Any]]:
+    """Convert a DataFrame to a dictionary of NumPy arrays keyed by column name."""
+    return {str(col): df[col].to_numpy() for col in df.columns}
+
+
+def preprocess_arrays(
+    data: dict[str, NDArray[Any]], wma_period: int, downcast: bool = True
+) -> dict[str, NDArray[Any]]:
+    """Preprocess the price arrays to calculate various technical indicators.
+
+    This function calculates the Average True Range (ATR), Weighted Moving Averages (WMA)
+    for open, high, low, and close prices, and Heikin-Ashi candlesticks for both original
+    and bid/ask prices.
+
+    Parameters
+    ----------
+    data : dict[str, NDArray[Any]]
+        A dictionary of arrays for open, high, low, close, ask, and bid prices.
+    wma_period : int
+        The period to be used for calculating the Weighted Moving Averages (WMA).
+    downcast : bool, optional
+        If True, downcast the floating point arrays to float32. The default is True.
+
+    Returns
+    -------
+    dict[str, NDArray[Any]]
+        A new dictionary with the input arrays and additional arrays for ATR, WMA,
+        and Heikin-Ashi candlesticks.
+
+    """
+    result = dict(data)
+
+    # calculate the ATR for the trailing stop loss
+    result["atr"] = talib.ATR(
+        np.asarray(data["high"], dtype=np.float64),
+        np.asarray(data["low"], dtype=np.float64),
+        np.asarray(data["close"], dtype=np.float64),
+        timeperiod=wma_period,
+    )
+
+    # calculate the Heikin-Ashi candlesticks and their WMA in a single pass for
+    # the original, bid and ask prices
+    for prefix in ["", "bid_", "ask_"]:
+        (
+            result[f"ha_{prefix}open"],
+            result[f"ha_{prefix}high"],
+            result[f"ha_{prefix}low"],
+            result[f"ha_{prefix}close"],
+            result[f"wma_ha_{prefix}open"],
+            result[f"wma_ha_{prefix}high"],
+            result[f"wma_ha_{prefix}low"],
+            result[f"wma_ha_{prefix}close"],
+        ) = ha_wma(
+            np.asarray(data[f"{prefix}open"], dtype=np.float64),
+            np.asarray(data[f"{prefix}high"], dtype=np.float64),
+            np.asarray(data[f"{prefix}low"], dtype=np.float64),
+            np.asarray(data[f"{prefix}close"], dtype=np.float64),
+            wma_period,
+        )
+
+    # calculate the WMA of the remaining price columns in a single pass
+    wma = wma_numpy(
+        np.stack([np.asarray(data[col], dtype=np.float64) for col in WMA_COLUMNS]),
+        wma_period,
+    )
+    for col, wma_row in zip(WMA_COLUMNS, wma):
+        result[f"wma_{col}"] = wma_row
+
+    # the signals only depend on the trend direction so single precision is
+    # enough and halves the memory moved by the kernels
+    for col, values in list(result.items()):
+        if downcast and values.dtype == np.float64:
+            result[col] = values.astype(np.float32)
+
+    return result
 
 
 def ohlc(
@@ -3,15 +3,15 @@
 from dataclasses import dataclass
 from functools import cached_property
 from typing import Any
-import pandas as pd
 
 from core.calc import (
     entry_price,
+    exit_total,
     take_profit,
     stop_loss as sl,
 )
 
-from enum import Enum
+from enum import Enum, IntEnum
 
 import numpy as np
 from numpy.typing import NDArray
@@ -20,6 +20,19 @@ from numba import jit  # type: ignore
 USE_QUASI = True
 USE_EXIT_BOUND = True
 
+PRICE_COLUMNS = [
+    f"{prefix}{price}"
+    for prefix in ["", "bid_", "ask_", "ha_", "ha_bid_", "ha_ask_"]
+    for price in ["open", "high", "low", "close"]
+]
+
+# column index of each column in the feature matrix used by the solver
+FeatureColumn = IntEnum(  # type: ignore[misc]
+    "FeatureColumn",
+    [*PRICE_COLUMNS, *(f"wma_{col}" for col in PRICE_COLUMNS), "atr"],
+    start=0,
+)
+
 
 class EdgeCategory(Enum):
     """Enumeration class for edge categories."""
@@ -81,6 +94,52 @@ class KernelConfig:
         else:
             return "bid_open"
 
+    @cached_property
+    def signal_buy_index(self) -> int:
+        """Return the feature matrix column for the buy signal column."""
+        return int(FeatureColumn[self.signal_buy_column])
+
+    @cached_property
+    def signal_exit_index(self) -> int:
+        """Return the feature matrix column for the exit signal column."""
+        return int(FeatureColumn[self.signal_exit_column])
+
+    @cached_property
+    def wma_index(self) -> int:
+        """Return the feature matrix column for the wma of the source column."""
+        return int(FeatureColumn[f"wma_{self.source_column}"])
+
+    @cached_property
+    def ask_index(self) -> int:
+        """Return the feature matrix column for the ask prices."""
+        return int(FeatureColumn[self.ask_column])
+
+    @cached_property
+    def bid_index(self) -> int:
+        """Return the feature matrix column for the bid prices."""
+        return int(FeatureColumn[self.bid_column])
+
+    @cached_property
+    def use_exit(self) -> bool:
+        """Return whether the exit signal column differs from the buy signal column."""
+        return self.signal_buy_column != self.signal_exit_column
+
+    @cached_property
+    def is_quasi(self) -> bool:
+        """Return whether the kernel has a quasi edge."""
+        return self.edge == EdgeCategory.Quasi
+
+    @cached_property
+    def should_roll(self) -> bool:
+        """Return whether the first wma value is treated as unknown.
+
+        Only non deterministic kernels on a source column other than the open
+        prices are rolled.
+        """
+        return (
+            "open" not in self.source_column and self.edge != EdgeCategory.Deterministic
+        )
+
     def __str__(self) -> str:
         """Return a string representation of the SignalConfig object."""
         return f"edge:{self.edge}, so:{self.source_column}, sib:{self.signal_buy_column}, sie:{self.signal_exit_column}, sl:{self.stop_loss}, tp:{self.take_profit}"
@@ -93,15 +152,20 @@ def wma_exit_signals(
     wma_data: NDArray[np.float64],
     should_roll: np.bool,
 ) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
-    """Calculate the weighted moving average."""
-    if should_roll:
-        np.roll(wma_data, 1)
-        wma_data[0] = np.nan
+    """Calculate the weighted moving average.
 
+    Rolling treats the first wma value as NaN without modifying wma_data, so the
+    same wma can be shared by concurrent backtests.
+    """
     # if USE_QUASI or USE_EXIT_BOUND:
     signals = np.zeros(len(buy_data)).astype(np.bool)
     buy_signals = np.where(buy_data > wma_data, np.True_, np.False_)
     exit_signals = np.where(exit_data > wma_data, np.True_, np.False_)
+    if should_roll:
+        # nothing compares greater than a NaN wma and only the first buy signal
+        # is read below
+        buy_signals[0] = False
+        exit_signals[0] = False
     for i in range(1, len(buy_signals)):
         An1 = buy_signals[i - 1]
         An = buy_signals[i]
@@ -133,27 +197,14 @@ def wma_signals_no_exit(
 
 
 @jit(nopython=True)  # type: ignore
-def kernel_stage_1(
+def kernel_signals(
     buy_data: NDArray[Any],
     exit_data: NDArray[Any],
     wma_data: NDArray[Any],
-    ask_data: NDArray[Any],
-    bid_data: NDArray[Any],
-    atr: NDArray[Any],
-    take_profit_conf: np.float64,
-    stop_loss_conf: np.float64,
     use_exit: np.bool,
     should_roll: np.bool,
-    erase: np.bool,
-) -> tuple[
-    NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]
-]:
-    """Perform the first stage of the kernel.
-
-    This function takes in arrays of high and low prices, a weighted moving average
-    (wma) array, ask and bid prices, average true range (atr), and take profit and
-    stop loss values. It then generates trading signals using the wma and prices,
-    calculates the entry prices, and applies any take profit or stop loss strategies.
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Generate the trading signals and triggers from the wma.
 
     Parameters
     ----------
@@ -163,27 +214,15 @@ def kernel_stage_1(
         The array of low prices.
     wma_data : NDArray[Any]
         The array of weighted moving average (wma) values.
-    ask_data : NDArray[Any]
-        The array of ask prices.
-    bid_data : NDArray[Any]
-        The array of bid prices.
-    atr : NDArray[Any]
-        The array of average true range (atr) values.
-    take_profit_conf : float
-        The take profit value as a multiplier of the atr.
-    stop_loss_conf : float
-        The stop loss value as a multiplier of the atr.
     use_exit : bool
         Whether to use exit data or not.
-    erase: bool
-        Whether to erase trades or not.
     should_roll: bool
         Whether to roll the wma or not.
 
     Returns
     -------
-    tuple[NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]]
-        A tuple containing the signal, trigger, position, exit value, exit total, and running total arrays.
+    tuple[NDArray[np.int64], NDArray[np.int64]]
+        A tuple containing the signal and trigger arrays.
 
     """
     # signal using the close prices
@@ -192,15 +231,57 @@ def kernel_stage_1(
     # 0 0 1 0 0 -1 0 - diff gives actual trigger
     # NOTE: usage of close prices differs online than in offline trading
     if use_exit:
-        signal, trigger = wma_exit_signals(
+        return wma_exit_signals(
             buy_data,
             exit_data,
             wma_data,
             should_roll,
         )
     else:
-        signal, trigger = wma_signals_no_exit(buy_data, wma_data)
+        return wma_signals_no_exit(buy_data, wma_data)
 
+
+# nopython kernels cannot take a config object so every array is passed flat
+@jit(nopython=True)  # type: ignore
+def kernel_exits(  # noqa: PLR0913, PLR0917
+    signal: NDArray[np.int64],
+    trigger: NDArray[np.int64],
+    ask_data: NDArray[Any],
+    bid_data: NDArray[Any],
+    take_profit_threshold: NDArray[Any],
+    stop_loss_threshold: NDArray[Any],
+    erase: np.bool,
+) -> tuple[
+    NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]
+]:
+    """Apply the entry prices and exit strategies to the trading signals.
+
+    The signal and trigger arrays are modified in place. An empty threshold array
+    disables the corresponding take profit or stop loss.
+
+    Parameters
+    ----------
+    signal : NDArray[np.int64]
+        The array of trading signals.
+    trigger : NDArray[np.int64]
+        The array of triggers.
+    ask_data : NDArray[Any]
+        The array of ask prices.
+    bid_data : NDArray[Any]
+        The array of bid prices.
+    take_profit_threshold : NDArray[Any]
+        The array of take profit thresholds, the atr times the take profit value.
+    stop_loss_threshold : NDArray[Any]
+        The array of stop loss thresholds, the negated atr times the stop loss value.
+    erase: bool
+        Whether to erase trades or not.
+
+    Returns
+    -------
+    tuple[NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]]
+        A tuple containing the signal, trigger, position, exit value, exit total, and running total arrays.
+
+    """
     # calculate the entry prices:
     position_value = entry_price(
         ask_data,
@@ -210,12 +291,11 @@ def kernel_stage_1(
     )
 
     # for internally managed take profits
-    if take_profit_conf > 0:
+    if take_profit_threshold.shape[0] > 0:
         signal, trigger = take_profit(
             position_value,
-            atr,
+            take_profit_threshold,
             signal,
-            take_profit_conf,
             trigger,
         )
         position_value = entry_price(
@@ -225,12 +305,11 @@ def kernel_stage_1(
             trigger,
         )
 
-    if stop_loss_conf > 0:
+    if stop_loss_threshold.shape[0] > 0:
         signal, trigger = sl(
             position_value,
-            atr,
+            stop_loss_threshold,
             signal,
-            stop_loss_conf,
             trigger,
         )
         position_value = entry_price(
@@ -253,61 +332,134 @@ def kernel_stage_1(
             trigger,
         )
 
-    exit_value = np.where(trigger == -1, position_value, 0)
-    et = np.cumsum(exit_value)
-    running_total = et + position_value * signal
+    exit_value, et, running_total = exit_total(position_value, trigger, signal)
 
     return signal, trigger, position_value, exit_value, et, running_total
 
 
+@jit(nopython=True)  # type: ignore
+def kernel_stage_1(
+    buy_data: NDArray[Any],
+    exit_data: NDArray[Any],
+    wma_data: NDArray[Any],
+    ask_data: NDArray[Any],
+    bid_data: NDArray[Any],
+    atr: NDArray[Any],
+    take_profit_conf: np.float64,
+    stop_loss_conf: np.float64,
+    use_exit: np.bool,
+    should_roll: np.bool,
+    erase: np.bool,
+) -> tuple[
+    NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]
+]:
+    """Perform the first stage of the kernel.
+
+    This function takes in arrays of high and low prices, a weighted moving average
+    (wma) array, ask and bid prices, average true range (atr), and take profit and
+    stop loss values. It then generates trading signals using the wma and prices,
+    calculates the entry prices, and applies any take profit or stop loss strategies.
+
+    Parameters
+    ----------
+    buy_data : NDArray[Any]
+        The array of high prices.
+    exit_data : NDArray[Any]
+        The array of low prices.
+    wma_data : NDArray[Any]
+        The array of weighted moving average (wma) values.
+    ask_data : NDArray[Any]
+        The array of ask prices.
+    bid_data : NDArray[Any]
+        The array of bid prices.
+    atr : NDArray[Any]
+        The array of average true range (atr) values.
+    take_profit_conf : float
+        The take profit value as a multiplier of the atr.
+    stop_loss_conf : float
+        The stop loss value as a multiplier of the atr.
+    use_exit : bool
+        Whether to use exit data or not.
+    erase: bool
+        Whether to erase trades or not.
+    should_roll: bool
+        Whether to roll the wma or not.
+
+    Returns
+    -------
+    tuple[NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any], NDArray[Any]]
+        A tuple containing the signal, trigger, position, exit value, exit total, and running total arrays.
+
+    """
+    signal, trigger = kernel_signals(
+        buy_data,
+        exit_data,
+        wma_data,
+        use_exit,
+        should_roll,
+    )
+
+    no_threshold = np.empty(0, dtype=atr.dtype)
+    return kernel_exits(
+        signal,
+        trigger,
+        ask_data,
+        bid_data,
+        (take_profit_conf * atr).astype(atr.dtype)
+        if take_profit_conf > 0
+        else no_threshold,
+        (-stop_loss_conf * atr).astype(atr.dtype)
+        if stop_loss_conf > 0
+        else no_threshold,
+        erase,
+    )
+
+
 def kernel(
-    df: pd.DataFrame,
+    data: dict[str, NDArray[Any]],
     config: KernelConfig,
-) -> pd.DataFrame:
-    """Process a DataFrame containing trading data.
+) -> dict[str, NDArray[Any]]:
+    """Process a dictionary of arrays containing trading data.
 
-    This function processes a DataFrame containing trading data and generate trading signals
-    using candlesticks and weighted moving average (wma).
+    This function processes arrays of trading data keyed by column name and generate
+    trading signals using candlesticks and weighted moving average (wma).
 
     TODO: support other pipelines
 
     Parameters
     ----------
-    df : pd.DataFrame
-        A DataFrame containing trading data.
+    data : dict[str, NDArray[Any]]
+        A dictionary of arrays containing trading data.
     config : KernelConfig
         A dataclass containing the configuration for the kernel.
 
     Returns
     -------
-    pd.DataFrame
-        A DataFrame containing the processed trading data.
+    dict[str, NDArray[Any]]
+        The input dictionary with the processed trading data added.
 
     """
     # calculate the entry and exit signals
-    df["wma"] = df[f"wma_{config.source_column}"]
-    should_roll = (
-        "open" not in config.source_column and config.edge != EdgeCategory.Deterministic
-    )
+    data["wma"] = data[f"wma_{config.source_column}"]
     (
-        df["signal"],
-        df["trigger"],
-        df["position_value"],
-        df["exit_value"],
-        df["exit_total"],
-        df["running_total"],
+        data["signal"],
+        data["trigger"],
+        data["position_value"],
+        data["exit_value"],
+        data["exit_total"],
+        data["running_total"],
     ) = kernel_stage_1(
-        df[config.signal_buy_column].to_numpy(),
-        df[config.signal_exit_column].to_numpy(),
-        df["wma"].to_numpy(),
-        df[config.ask_column].to_numpy(),
-        df[config.bid_column].to_numpy(),
-        df["atr"].to_numpy(),
+        data[config.signal_buy_column],
+        data[config.signal_exit_column],
+        data["wma"],
+        data[config.ask_column],
+        data[config.bid_column],
+        data["atr"],
         config.take_profit,
         config.stop_loss,
-        config.signal_buy_column != config.signal_exit_column,
-        should_roll,
-        config.edge == EdgeCategory.Quasi,
+        config.use_exit,
+        config.should_roll,
+        config.is_quasi,
     )
 
-    return df
+    return data
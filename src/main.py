@@ -1,5 +1,7 @@
 """Main module."""
 
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from datetime import datetime
 import logging
 import logging.config
@@ -40,6 +42,16 @@ USAGE = """
       """
 
 
+def _solve_date(
+    args: tuple[ChartConfig, KernelConfig, SolverConfig, str, datetime],
+) -> tuple[float, float, float]:
+    """Run the segmented solve for a single date in a worker process."""
+    chart_conf, kernel_conf, solver_conf, token, date = args
+    return segmented_solve(
+        replace(chart_conf, date_from=date), kernel_conf, token, solver_conf
+    )
+
+
 if __name__ == "__main__":
     start_time = datetime.now()
     if TOKEN is None or ACCOUNT_ID is None:
@@ -90,23 +102,36 @@ if __name__ == "__main__":
                 )
                 result = (raw_zk + pk) / 2
             else:
-                for date in solver_conf.dates:
-                    chart_conf.date_from = date
-                    raw_zk, refined_zk, pk = segmented_solve(
-                        chart_conf, kernel_conf, TOKEN, solver_conf
-                    )
-
-                    sum_raw_zk += raw_zk
-                    sum_refined_zk += refined_zk
-                    sum_pk += pk
-                    result += (raw_zk + pk) / 2
-                    logger.info(
-                        "rt:%s raw_zk: %s refined_zk:%s pk:%s",
-                        round(result, 5),
-                        round(raw_zk, 5),
-                        round(refined_zk, 5),
-                        round(pk, 5),
+                # the dates are independent so solve them in separate processes
+                # and split the cores between the solver threads of each process
+                cpu_count = os.cpu_count() or 1
+                max_workers = min(len(solver_conf.dates), cpu_count)
+                if solver_conf.num_threads == 0:
+                    solver_conf.num_threads = max(cpu_count // max_workers, 1)
+                with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    initializer=logging.config.dictConfig,
+                    initargs=(logging_conf,),
+                ) as executor:
+                    results = executor.map(
+                        _solve_date,
+                        [
+                            (chart_conf, kernel_conf, solver_conf, TOKEN, date)
+                            for date in solver_conf.dates
+                        ],
                     )
+                    for raw_zk, refined_zk, pk in results:
+                        sum_raw_zk += raw_zk
+                        sum_refined_zk += refined_zk
+                        sum_pk += pk
+                        result += (raw_zk + pk) / 2
+                        logger.info(
+                            "rt:%s raw_zk: %s refined_zk:%s pk:%s",
+                            round(result, 5),
+                            round(raw_zk, 5),
+                            round(refined_zk, 5),
+                            round(pk, 5),
+                        )
 
         logger.info(
             "rt:%s raw_zk: %s refined_zk:%s pk:%s (final)",
@@ -0,0 +1,114 @@
+"""Tests for the rolling window of the live bot."""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bot.live
+from bot.common import ChartConfig
+from bot.live import LiveState
+from core.chart import frame_to_arrays, preprocess_arrays
+
+CANDLE_COUNT = 200
+WMA_PERIOD = 14
+
+
+def _history(n: int) -> pd.DataFrame:
+    """Build a random walk of M5 candles in the Oanda format."""
+    rng = np.random.default_rng(1)
+    mid = 1.1 + np.cumsum(rng.normal(0, 1e-4, n))
+    open_ = mid + rng.normal(0, 3e-5, n)
+    close = mid + rng.normal(0, 3e-5, n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 5e-5, n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 5e-5, n))
+    data = {
+        "timestamp": pd.date_range(
+            "2025-01-01", periods=n, freq="5min", tz="UTC"
+        ).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"),
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+    }
+    for prefix, spread in (("bid_", -5e-5), ("ask_", 5e-5)):
+        for col, values in (("open", open_), ("high", high), ("low", low)):
+            data[f"{prefix}{col}"] = values + spread
+        data[f"{prefix}close"] = close + spread
+
+    return pd.DataFrame(data)
+
+
+def _candles(history: pd.DataFrame, start: int, stop: int) -> pd.DataFrame:
+    """Return the candles up to stop with the last one still forming."""
+    candles = history.iloc[max(start, 0) : stop].reset_index(drop=True)
+    if len(candles) > 0:
+        # the last candle has only traded at its open so far
+        for prefix in ["", "bid_", "ask_"]:
+            last = candles.index[-1]
+            price = candles.at[last, f"{prefix}open"]
+            candles.loc[last, [f"{prefix}high", f"{prefix}low", f"{prefix}close"]] = (
+                price
+            )
+
+    return candles
+
+
+@pytest.mark.parametrize("inclusive", [True, False])
+def test_refresh_matches_full_preprocess(
+    monkeypatch: pytest.MonkeyPatch, inclusive: bool
+) -> None:
+    """Each tick should leave the trailing bars equal to a full preprocess."""
+    history = _history(400)
+    times = pd.to_datetime(history["timestamp"])
+    now = CANDLE_COUNT
+    firsts = []
+
+    def get_candles(
+        ctx: object,
+        granularity: str = "M5",
+        count: int = 288,
+        fromTime: datetime | None = None,
+    ) -> pd.DataFrame:
+        if fromTime is None:
+            return _candles(history, now - count, now)
+
+        # oanda either includes the candle at the from time or starts after it
+        start = int(
+            np.searchsorted(
+                times, pd.Timestamp(fromTime), "left" if inclusive else "right"
+            )
+        )
+        candles = _candles(history, start, min(start + count, now))
+        firsts.append(candles["timestamp"][0])
+        return candles
+
+    monkeypatch.setattr(bot.live, "getOandaOHLC", get_candles)
+    state = LiveState(
+        chart_conf=ChartConfig(
+            instrument="EUR_USD", granularity="M5", candle_count=CANDLE_COUNT
+        ),
+        wma_period=WMA_PERIOD,
+    )
+
+    state.refresh(None)  # type: ignore
+    for step in [1, 1, 2, 3, 1, 5, 1]:
+        now += step
+        first = state.data["timestamp"][-2 if inclusive else -1]
+        data = state.refresh(None)  # type: ignore
+        assert firsts[-1] == first
+
+        expected = preprocess_arrays(
+            frame_to_arrays(_candles(history, now - CANDLE_COUNT, now)),
+            WMA_PERIOD,
+            downcast=False,
+        )
+        assert data.keys() == expected.keys()
+        np.testing.assert_array_equal(data["timestamp"], expected["timestamp"])
+        for col, values in expected.items():
+            if col != "timestamp":
+                # the recurrences started earlier so only the trailing bars agree
+                np.testing.assert_allclose(
+                    data[col][-20:], values[-20:], rtol=1e-6, err_msg=col
+                )